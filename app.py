@@ -1,52 +1,232 @@
 # app.py
+import argparse
+import atexit
 import logging
+import logging.handlers
+import queue
+import struct
 import json
 import random
 import time
-from datetime import datetime
-from typing import Dict, List
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
 import uuid
+from collections import namedtuple
+
+# orjson (extension C) est utilisé s'il est disponible, sinon on retombe sur json
+try:
+    import orjson
+
+    def dumps_log(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    def dumps_log(obj) -> str:
+        return json.dumps(obj)
+
+# Vues légères (une ligne) sur les colonnes d'utilisateurs et de produits
+User = namedtuple('User', 'user_id username email location')
+Product = namedtuple('Product', 'product_id name category price stock')
+
+class BatchedFileHandler(logging.FileHandler):
+    """FileHandler qui accumule les records en mémoire et les écrit par blocs.
+
+    Le tampon est vidé dès qu'il dépasse `flush_bytes` octets ou que
+    `flush_interval` secondes se sont écoulées depuis la dernière écriture.
+    """
+
+    def __init__(self, filename, flush_bytes: int = 65536, flush_interval: float = 0.5, encoding: str = 'utf-8'):
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._buf = bytearray()
+        self._last_flush = time.monotonic()
+        super().__init__(filename, mode='ab', encoding=None)
+        self.line_encoding = encoding
+
+    def _open(self):
+        return open(self.baseFilename, self.mode)
+
+    def emit(self, record):
+        try:
+            self._buf += (self.format(record) + self.terminator).encode(self.line_encoding)
+            if len(self._buf) >= self.flush_bytes or time.monotonic() - self._last_flush > self.flush_interval:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._buf:
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(self._buf)
+                self._buf.clear()
+            if self.stream and hasattr(self.stream, 'flush'):
+                self.stream.flush()
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+class FramedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler binaire : chaque record est écrit sous forme de trame
+    `longueur (uint32 little-endian) + JSON UTF-8`, lisible par LogParser.parse_framed.
+    """
+
+    FRAME_HEADER = struct.Struct('<I')
+
+    def __init__(self, filename, maxBytes: int = 256 * 1024 * 1024, backupCount: int = 5):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount)
+
+    def _open(self):
+        return open(self.baseFilename, 'ab')
+
+    def emit(self, record):
+        try:
+            data = self.format(record).encode('utf-8')
+            frame = self.FRAME_HEADER.pack(len(data)) + data
+            if self.stream is None:
+                self.stream = self._open()
+            position = self.stream.tell()
+            if self.maxBytes > 0 and position > 0 and position + len(frame) > self.maxBytes:
+                self.doRollover()
+            self.stream.write(frame)
+        except Exception:
+            self.handleError(record)
 
 class EcommerceApp:
-    def __init__(self):
-        self.setup_logging()
-        self.users = self.generate_users(100)
-        self.products = self.generate_products(50)
+    def __init__(self, realtime: bool = False, seed: int | None = None, framed_log_path: str | None = None):
+        # Générateur propre à l'instance (initialisé depuis os.urandom si seed est None)
+        self.rng = random.Random(seed)
+        # En mode virtuel (par défaut), les pauses avancent une horloge simulée au lieu de dormir
+        self.realtime = realtime
+        self._virtual_now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.setup_logging(framed_log_path)
+        # Utilisateurs et produits stockés en colonnes (une liste par attribut)
+        self.user_ids, self.usernames, self.user_emails, self.user_locations = self.generate_users(100)
+        self.product_ids, self.product_names, self.product_categories, self.product_prices, self.product_stocks = self.generate_products(50)
+        self.ip_pool = self.generate_ip_pool(10_000)
+        self.user_agents = self.define_user_agents()
+        # Fragments JSON pré-encodés (user agents, pays) insérés tels quels dans chaque ligne de log
+        self._user_agents_json = [dumps_log(ua) for ua in self.user_agents]
+        self._locations_json = {location: dumps_log(location) for location in set(self.user_locations)}
+        # Gabarits de lignes de log pré-construits pour chaque type d'événement connu
+        self._line_templates = {event_type: self.build_line_template(event_type) for event_type in self.define_event_types()}
         # Define traffic patterns for each hour (0-23)
         # Values are multipliers for base number of user journeys
         self.traffic_patterns = self.define_traffic_patterns()
         self.error_types = self.define_error_types()
-
-    def setup_logging(self):
-        """Configuration du logging structuré"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(message)s',
-            handlers=[
-                logging.FileHandler('app.log'),
-                logging.StreamHandler()
-            ]
+        # Index des erreurs par code pour des recherches en O(1)
+        self.error_by_code = {e['code']: e for e in self.error_types}
+        self._checkout_errors = (
+            self.error_by_code['PAYMENT_FAILED'],
+            self.error_by_code['CHECKOUT_ERROR'],
+            self.error_by_code['SERVER_TIMEOUT']
         )
+
+    def setup_logging(self, framed_log_path: str | None = None):
+        """Configuration du logging structuré (asynchrone via une file d'attente).
+        Si `framed_log_path` est fourni, les événements y sont aussi écrits en trames binaires.
+        Comme basicConfig, la configuration n'est faite qu'une fois par processus : une instance
+        suivante réutilise les handlers déjà en place (et ignore son `framed_log_path`)."""
         self.logger = logging.getLogger(__name__)
+        # Logger des méta-informations (progression, erreurs du simulateur)
+        self.sim_logger = logging.getLogger(f'{__name__}.simulation')
+        if any(isinstance(handler, logging.handlers.QueueHandler) for handler in self.logger.handlers):
+            self.log_listener = None
+            return
+
+        formatter = logging.Formatter('%(message)s')
+        file_handler = BatchedFileHandler('app.log')
+        file_handler.setFormatter(formatter)
+        # app.log ne contient que les événements ; les messages de la simulation vont sur la console
+        file_handler.addFilter(lambda record: record.name == __name__)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers = [file_handler, stream_handler]
+        if framed_log_path:
+            framed_handler = FramedRotatingFileHandler(framed_log_path)
+            framed_handler.setFormatter(formatter)
+            framed_handler.addFilter(lambda record: record.name == __name__)
+            handlers.append(framed_handler)
+
+        # Le simulateur ne fait qu'empiler les records ; l'écriture disque/console
+        # est faite par le QueueListener dans un thread d'arrière-plan
+        log_queue = queue.Queue(-1)
+        self.log_listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        self.log_listener.start()
+        atexit.register(self.log_listener.stop)
+
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(queue_handler)
+        self.logger.propagate = False
+
+        self.sim_logger.setLevel(logging.INFO)
+        self.sim_logger.addHandler(queue_handler)
+        self.sim_logger.propagate = False
+
+    def build_line_template(self, event_type: str) -> str:
+        """Construit le gabarit %-format d'une ligne de log, avec le type d'événement déjà encodé."""
+        event_type_json = dumps_log(event_type).replace('%', '%%')
+        return (
+            '{"timestamp":"%s",'
+            f'"event_type":{event_type_json},'
+            '"session_id":"%s","user_id":%s,"ip_address":"%s","user_agent":%s,"location":%s,"data":%s}'
+        )
+
+    def new_id(self) -> str:
+        """UUID version 4 tiré du générateur de l'instance (reproductible avec --seed), à la demande."""
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def build_log_line(self, event_type: str, data: Dict) -> str:
+        """Assemble directement la ligne JSON d'un événement à partir de fragments pré-encodés."""
+        template = self._line_templates.get(event_type) or self.build_line_template(event_type)
+        location = data.get('location') # Add user's location to the log
+        location_json = self._locations_json.get(location) or dumps_log(location)
+        return template % (
+            self.now().isoformat(),
+            self.new_id(),
+            dumps_log(data.get('user_id')),
+            self.generate_ip(), # IP address is still random per event
+            self.rng.choice(self._user_agents_json),
+            location_json,
+            dumps_log(data)
+        )
 
     def log_event(self, event_type: str, data: Dict):
         """Génère un log structuré"""
         try:
-            log_entry = {
-                'timestamp': datetime.now().isoformat(),
-                'event_type': event_type,
-                'session_id': str(uuid.uuid4()),
-                'user_id': data.get('user_id'),
-                'ip_address': self.generate_ip(), # IP address is still random per event
-                'user_agent': self.generate_user_agent(),
-                'location': data.get('location'), # Add user's location to the log
-                'data': data
-            }
-            self.logger.info(json.dumps(log_entry))
+            self.logger.info(self.build_log_line(event_type, data))
         except TypeError as e:
-            self.logger.error(f"Error serializing log entry for event_type '{event_type}': {e}. Data: {data}")
+            self.sim_logger.error("Error serializing log entry for event_type '%s': %s. Data: %s", event_type, e, data)
         except Exception as e:
-            self.logger.error(f"An unexpected error occurred in log_event for event_type '{event_type}': {e}. Data: {data}")
+            self.sim_logger.error("An unexpected error occurred in log_event for event_type '%s': %s. Data: %s", event_type, e, data)
+
+    def now(self) -> datetime:
+        """Heure courante de la simulation (réelle ou virtuelle)."""
+        return datetime.now() if self.realtime else self._virtual_now
+
+    def pause(self, min_seconds: float, max_seconds: float):
+        """Attend une durée aléatoire ; en mode virtuel, avance simplement l'horloge simulée."""
+        duration = self.rng.uniform(min_seconds, max_seconds)
+        if self.realtime:
+            time.sleep(duration)
+        else:
+            self._virtual_now += timedelta(seconds=duration)
+
+    def define_event_types(self) -> List[str]:
+        """Définit les types d'événements émis par la simulation."""
+        return [
+            'page_view', 'login', 'user_registration', 'error', 'product_view', 'search',
+            'add_to_cart', 'remove_from_cart', 'checkout_initiated', 'cart_abandoned',
+            'purchase', 'add_to_wishlist', 'submit_review', 'logout', 'user_session_end'
+        ]
 
     def define_traffic_patterns(self) -> List[float]:
         """Définit les patterns de trafic (multiplicateurs) pour chaque heure de la journée."""
@@ -79,42 +259,64 @@ class EcommerceApp:
 
     def get_random_error_details(self) -> Dict:
         """Retourne des détails aléatoires sur une erreur."""
-        return random.choice(self.error_types)
+        return self.rng.choice(self.error_types)
 
-    def generate_users(self, count: int) -> List[Dict]:
-        """Génère une liste d'utilisateurs factices avec géolocalisation."""
-        users = []
+    def generate_users(self, count: int) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """Génère des utilisateurs factices avec géolocalisation, en colonnes (ids, noms, emails, pays)."""
         countries = ['USA', 'Canada', 'France', 'Germany', 'UK', 'Australia', 'Japan', 'Brazil', 'India']
-        for i in range(count):
-            users.append({
-                'user_id': str(uuid.uuid4()),
-                'username': f'user_{i}',
-                'email': f'user_{i}@example.com',
-                'location': random.choice(countries) # Assign a random country
-            })
-        return users
-
-    def generate_products(self, count: int) -> List[Dict]:
-        """Génère une liste de produits factices."""
-        products = []
+        # Tirage des pays en un seul appel plutôt qu'un tirage par utilisateur
+        locations = self.rng.choices(countries, k=count)
+        user_ids = [self.new_id() for _ in range(count)]
+        usernames = [f'user_{i}' for i in range(count)]
+        emails = [f'user_{i}@example.com' for i in range(count)]
+        return user_ids, usernames, emails, locations
+
+    def generate_products(self, count: int) -> Tuple[List[str], List[str], List[str], List[float], List[int]]:
+        """Génère des produits factices, en colonnes (ids, noms, catégories, prix, stocks)."""
         categories = ['Electronics', 'Books', 'Clothing', 'Home & Kitchen', 'Sports']
-        for i in range(count):
-            products.append({
-                'product_id': str(uuid.uuid4()),
-                'name': f'Product {i}',
-                'category': random.choice(categories),
-                'price': round(random.uniform(10.0, 1000.0), 2),
-                'stock': random.randint(0, 200)
-            })
-        return products
+        product_ids = [self.new_id() for _ in range(count)]
+        names = [f'Product {i}' for i in range(count)]
+        product_categories = self.rng.choices(categories, k=count)
+        prices = [round(self.rng.uniform(10.0, 1000.0), 2) for _ in range(count)]
+        stocks = self.rng.choices(range(201), k=count)
+        return product_ids, names, product_categories, prices, stocks
+
+    def get_user(self, i: int) -> User:
+        """Retourne la vue de l'utilisateur d'indice i."""
+        return User(self.user_ids[i], self.usernames[i], self.user_emails[i], self.user_locations[i])
+
+    def get_product(self, i: int) -> Product:
+        """Retourne la vue du produit d'indice i."""
+        return Product(self.product_ids[i], self.product_names[i], self.product_categories[i],
+                       self.product_prices[i], self.product_stocks[i])
+
+    def pick_user(self) -> User:
+        """Retourne un utilisateur aléatoire."""
+        return self.get_user(self.rng.randrange(len(self.user_ids)))
+
+    def pick_product(self) -> Product:
+        """Retourne un produit aléatoire."""
+        return self.get_product(self.rng.randrange(len(self.product_ids)))
+
+    def sample_products(self, k: int) -> List[Product]:
+        """Retourne k produits distincts tirés aléatoirement."""
+        return [self.get_product(i) for i in self.rng.sample(range(len(self.product_ids)), k)]
+
+    def generate_ip_pool(self, count: int) -> List[str]:
+        """Génère un pool d'adresses IP aléatoires déjà formatées."""
+        first = self.rng.choices(range(1, 255), k=count)
+        second = self.rng.choices(range(0, 255), k=count)
+        third = self.rng.choices(range(0, 255), k=count)
+        fourth = self.rng.choices(range(1, 255), k=count)
+        return [f"{a}.{b}.{c}.{d}" for a, b, c, d in zip(first, second, third, fourth)]
 
     def generate_ip(self) -> str:
-        """Génère une adresse IP aléatoire."""
-        return f"{random.randint(1,254)}.{random.randint(0,254)}.{random.randint(0,254)}.{random.randint(1,254)}"
+        """Retourne une adresse IP aléatoire tirée du pool pré-calculé."""
+        return self.rng.choice(self.ip_pool)
 
-    def generate_user_agent(self) -> str:
-        """Génère un user agent aléatoire."""
-        user_agents = [
+    def define_user_agents(self) -> List[str]:
+        """Définit la liste des user agents simulés."""
+        return [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36", # Desktop Chrome
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.3 Safari/605.1.15", # Desktop Safari
             "Mozilla/5.0 (Linux; Android 10; SM-G973F) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Mobile Safari/537.36", # Android Chrome
@@ -122,117 +324,124 @@ class EcommerceApp:
             "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:98.0) Gecko/20100101 Firefox/98.0", # Desktop Firefox
             "Mozilla/5.0 (iPad; CPU OS 13_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/83.0.4103.88 Mobile/15E148 Safari/604.1" # iPad Chrome
         ]
-        return random.choice(user_agents)
 
-    def simulate_user_journey(self, current_hour: int):
-        """Simule un parcours utilisateur complet avec différents événements, influencé par l'heure."""
-        if not self.users:
-            self.logger.error("No users available for simulation. Please check generate_users.")
+    def generate_user_agent(self) -> str:
+        """Génère un user agent aléatoire."""
+        return self.rng.choice(self.user_agents)
+
+    def simulate_user_journey(self, traffic_mult: float):
+        """Simule un parcours utilisateur complet avec différents événements, influencé par le multiplicateur de trafic de l'heure."""
+        if not self.user_ids:
+            self.sim_logger.error("No users available for simulation. Please check generate_users.")
             return
 
-        user = random.choice(self.users)
-        user_id = user['user_id']
-        user_location = user['location']
+        # Méthodes du générateur liées en variables locales pour la boucle chaude
+        rng = self.rng
+        rand, randint, choice, sample = rng.random, rng.randint, rng.choice, rng.sample
+
+        user = self.pick_user()
+        user_id = user.user_id
+        user_location = user.location
 
         # 0. Page View (initial landing)
         self.log_event('page_view', {'user_id': user_id, 'page_url': '/', 'location': user_location})
-        time.sleep(random.uniform(0.1, 0.5))
+        self.pause(0.1, 0.5)
 
         # 1. User Login/Registration
-        event_type = random.choice(['login', 'user_registration'])
+        event_type = choice(['login', 'user_registration'])
         self.log_event(event_type, {'user_id': user_id, 'location': user_location})
-        time.sleep(random.uniform(0.1, 0.5))
+        self.pause(0.1, 0.5)
 
         # Simulate a potential error after login (higher chance during peak hours)
-        if random.random() < (0.05 + self.traffic_patterns[current_hour] * 0.02): # Base 5% + up to 4% more during peak
+        if rand() < (0.05 + traffic_mult * 0.02): # Base 5% + up to 4% more during peak
             error_details = self.get_random_error_details()
             self.log_event('error', {'user_id': user_id, 'error_code': error_details['code'], 'message': error_details['message'], 'location': user_location})
-            time.sleep(random.uniform(0.1, 0.3))
+            self.pause(0.1, 0.3)
 
         # 2. Product Browsing (multiple times)
-        num_browsed_products = random.randint(1, 5)
-        if not self.products:
+        num_browsed_products = randint(1, 5)
+        if not self.product_ids:
             self.log_event('error', {'user_id': user_id, 'error_code': 'NO_PRODUCTS_AVAILABLE', 'message': 'Cannot browse, no products in catalog', 'location': user_location})
             return
-        browsed_products = random.sample(self.products, min(len(self.products), num_browsed_products))
+        browsed_products = self.sample_products(min(len(self.product_ids), num_browsed_products))
 
         for prod in browsed_products:
             self.log_event('product_view', {
                 'user_id': user_id,
-                'product_id': prod['product_id'],
-                'product_name': prod['name'],
-                'price': prod['price'],
+                'product_id': prod.product_id,
+                'product_name': prod.name,
+                'price': prod.price,
                 'location': user_location
             })
-            time.sleep(random.uniform(0.1, 0.3))
-            self.log_event('page_view', {'user_id': user_id, 'page_url': f'/products/{prod["product_id"]}', 'location': user_location})
+            self.pause(0.1, 0.3)
+            self.log_event('page_view', {'user_id': user_id, 'page_url': f'/products/{prod.product_id}', 'location': user_location})
 
             # Simulate product not found error
-            if random.random() < 0.01: # 1% chance of product not found error
-                error_details = next((e for e in self.error_types if e['code'] == 'PRODUCT_NOT_FOUND'), {'code': 'PRODUCT_NOT_FOUND', 'message': 'Product not found'})
+            if rand() < 0.01: # 1% chance of product not found error
+                error_details = self.error_by_code['PRODUCT_NOT_FOUND']
                 self.log_event('error', {'user_id': user_id, 'error_code': error_details['code'], 'message': error_details['message'], 'product_id': 'non-existent-id', 'location': user_location})
-                time.sleep(random.uniform(0.1, 0.3))
+                self.pause(0.1, 0.3)
 
 
         # 3. Search (optional, more likely during peak hours)
-        if random.random() < (0.5 + self.traffic_patterns[current_hour] * 0.1): # Base 50% + up to 20% more during peak
-            search_term = random.choice(['laptop', 'book', 'shirt', 'kitchen', 'ball', 'smartwatch', 'headphones'])
+        if rand() < (0.5 + traffic_mult * 0.1): # Base 50% + up to 20% more during peak
+            search_term = choice(['laptop', 'book', 'shirt', 'kitchen', 'ball', 'smartwatch', 'headphones'])
             self.log_event('search', {
                 'user_id': user_id,
                 'search_term': search_term,
-                'results_count': random.randint(0, 20),
+                'results_count': randint(0, 20),
                 'location': user_location
             })
-            time.sleep(random.uniform(0.1, 0.5))
+            self.pause(0.1, 0.5)
             self.log_event('page_view', {'user_id': user_id, 'page_url': f'/search?q={search_term}', 'location': user_location})
 
         # 4. Add to Cart (1 to 3 products, more likely during peak hours)
         cart_products = []
         if browsed_products:
-            cart_products = random.sample(browsed_products, min(len(browsed_products), random.randint(1, 3)))
+            cart_products = sample(browsed_products, min(len(browsed_products), randint(1, 3)))
 
         cart_items_data = []
         for prod in cart_products:
-            quantity = random.randint(1, 2)
+            quantity = randint(1, 2)
             # Simulate out of stock error
-            if random.random() < 0.03 and prod['stock'] < quantity: # 3% chance if stock is low
-                error_details = next((e for e in self.error_types if e['code'] == 'OUT_OF_STOCK'), {'code': 'OUT_OF_STOCK', 'message': 'Product is out of stock'})
-                self.log_event('error', {'user_id': user_id, 'error_code': error_details['code'], 'message': error_details['message'], 'product_id': prod['product_id'], 'location': user_location})
-                time.sleep(random.uniform(0.1, 0.3))
+            if rand() < 0.03 and prod.stock < quantity: # 3% chance if stock is low
+                error_details = self.error_by_code['OUT_OF_STOCK']
+                self.log_event('error', {'user_id': user_id, 'error_code': error_details['code'], 'message': error_details['message'], 'product_id': prod.product_id, 'location': user_location})
+                self.pause(0.1, 0.3)
                 continue # Skip adding this product to cart
 
             self.log_event('add_to_cart', {
                 'user_id': user_id,
-                'product_id': prod['product_id'],
-                'product_name': prod['name'],
+                'product_id': prod.product_id,
+                'product_name': prod.name,
                 'quantity': quantity,
-                'price': prod['price'],
+                'price': prod.price,
                 'location': user_location
             })
             cart_items_data.append({
-                'product_id': prod['product_id'],
+                'product_id': prod.product_id,
                 'quantity': quantity,
-                'price': prod['price']
+                'price': prod.price
             })
-            time.sleep(random.uniform(0.1, 0.3))
+            self.pause(0.1, 0.3)
             self.log_event('page_view', {'user_id': user_id, 'page_url': '/cart', 'location': user_location})
 
         # 5. Remove from Cart (optional, if cart has items)
-        if cart_items_data and random.random() < 0.3:
-            item_to_remove = random.choice(cart_items_data)
+        if cart_items_data and rand() < 0.3:
+            item_to_remove = choice(cart_items_data)
             self.log_event('remove_from_cart', {
                 'user_id': user_id,
                 'product_id': item_to_remove['product_id'],
                 'location': user_location
             })
             cart_items_data = [item for item in cart_items_data if item['product_id'] != item_to_remove['product_id']]
-            time.sleep(random.uniform(0.1, 0.3))
+            self.pause(0.1, 0.3)
             self.log_event('page_view', {'user_id': user_id, 'page_url': '/cart', 'location': user_location})
 
         # 6. Checkout (only if cart has items)
         if cart_items_data:
             total_amount = sum(item['quantity'] * item['price'] for item in cart_items_data)
-            order_id = str(uuid.uuid4())
+            order_id = self.new_id()
             self.log_event('checkout_initiated', {
                 'user_id': user_id,
                 'order_id': order_id,
@@ -240,21 +449,17 @@ class EcommerceApp:
                 'number_of_items': len(cart_items_data),
                 'location': user_location
             })
-            time.sleep(random.uniform(0.5, 1.5))
+            self.pause(0.5, 1.5)
             self.log_event('page_view', {'user_id': user_id, 'page_url': '/checkout', 'location': user_location})
 
             # Simulate a potential error during checkout (higher chance during peak hours)
-            if random.random() < (0.05 + self.traffic_patterns[current_hour] * 0.03): # Base 5% + up to 6% more during peak
-                error_details = random.choice([
-                    next((e for e in self.error_types if e['code'] == 'PAYMENT_FAILED')),
-                    next((e for e in self.error_types if e['code'] == 'CHECKOUT_ERROR')),
-                    next((e for e in self.error_types if e['code'] == 'SERVER_TIMEOUT'))
-                ])
+            if rand() < (0.05 + traffic_mult * 0.03): # Base 5% + up to 6% more during peak
+                error_details = choice(self._checkout_errors)
                 self.log_event('error', {'user_id': user_id, 'error_code': error_details['code'], 'message': error_details['message'], 'order_id': order_id, 'location': user_location})
-                time.sleep(random.uniform(0.1, 0.3))
+                self.pause(0.1, 0.3)
                 # If checkout fails, user might abandon or retry (for simplicity, we abandon)
                 self.log_event('cart_abandoned', {'user_id': user_id, 'reason': 'checkout_error', 'order_id': order_id, 'location': user_location})
-                time.sleep(random.uniform(0.1, 0.5))
+                self.pause(0.1, 0.5)
                 return # End journey if checkout failed
 
             # 7. Purchase (Order Confirmation)
@@ -263,78 +468,91 @@ class EcommerceApp:
                 'order_id': order_id,
                 'total_amount': round(total_amount, 2),
                 'items': cart_items_data,
-                'payment_method': random.choice(['credit_card', 'paypal', 'bank_transfer']),
+                'payment_method': choice(['credit_card', 'paypal', 'bank_transfer']),
                 'location': user_location
             })
-            time.sleep(random.uniform(0.1, 0.5))
+            self.pause(0.1, 0.5)
             self.log_event('page_view', {'user_id': user_id, 'page_url': f'/order-confirmation/{order_id}', 'location': user_location})
 
         else:
             self.log_event('cart_abandoned', {'user_id': user_id, 'reason': 'no_items_in_cart', 'location': user_location})
-            time.sleep(random.uniform(0.1, 0.5))
+            self.pause(0.1, 0.5)
 
         # 8. Add to Wishlist (optional)
-        if random.random() < 0.2:
-            if not self.products:
+        if rand() < 0.2:
+            if not self.product_ids:
                 self.log_event('error', {'user_id': user_id, 'error_code': 'NO_PRODUCTS_FOR_WISHLIST', 'message': 'Cannot add to wishlist, no products in catalog', 'location': user_location})
             else:
-                wishlist_product = random.choice(self.products)
+                wishlist_product = self.pick_product()
                 self.log_event('add_to_wishlist', {
                     'user_id': user_id,
-                    'product_id': wishlist_product['product_id'],
-                    'product_name': wishlist_product['name'],
+                    'product_id': wishlist_product.product_id,
+                    'product_name': wishlist_product.name,
                     'location': user_location
                 })
-                time.sleep(random.uniform(0.1, 0.3))
+                self.pause(0.1, 0.3)
                 self.log_event('page_view', {'user_id': user_id, 'page_url': '/wishlist', 'location': user_location})
 
         # 9. Submit Review (optional, after purchase)
-        if cart_items_data and random.random() < 0.1:
+        if cart_items_data and rand() < 0.1:
             if not cart_products:
-                self.logger.warning(f"Attempted to submit review for user {user_id} but cart_products was empty.")
+                self.sim_logger.warning("Attempted to submit review for user %s but cart_products was empty.", user_id)
             else:
-                reviewed_product = random.choice(cart_products)
+                reviewed_product = choice(cart_products)
                 self.log_event('submit_review', {
                     'user_id': user_id,
-                    'product_id': reviewed_product['product_id'],
-                    'rating': random.randint(1, 5),
-                    'review_text': f"Great product! Very satisfied with {reviewed_product['name']}.",
+                    'product_id': reviewed_product.product_id,
+                    'rating': randint(1, 5),
+                    'review_text': f"Great product! Very satisfied with {reviewed_product.name}.",
                     'location': user_location
                 })
-                time.sleep(random.uniform(0.1, 0.5))
-                self.log_event('page_view', {'user_id': user_id, 'page_url': f'/products/{reviewed_product["product_id"]}/review', 'location': user_location})
+                self.pause(0.1, 0.5)
+                self.log_event('page_view', {'user_id': user_id, 'page_url': f'/products/{reviewed_product.product_id}/review', 'location': user_location})
 
         # 10. Logout (optional, more likely after peak hours)
-        if random.random() < (0.8 - self.traffic_patterns[current_hour] * 0.1): # Less likely during peak, more likely off-peak
+        if rand() < (0.8 - traffic_mult * 0.1): # Less likely during peak, more likely off-peak
             self.log_event('logout', {'user_id': user_id, 'location': user_location})
-            time.sleep(random.uniform(0.1, 0.5))
+            self.pause(0.1, 0.5)
             self.log_event('page_view', {'user_id': user_id, 'page_url': '/logout', 'location': user_location})
 
-        self.log_event('user_session_end', {'user_id': user_id, 'duration_seconds': random.randint(30, 300), 'location': user_location})
+        self.log_event('user_session_end', {'user_id': user_id, 'duration_seconds': randint(30, 300), 'location': user_location})
 
     def run_simulation(self, num_days: int = 1):
         """Exécute la simulation pour un nombre donné de jours, en tenant compte des patterns de trafic."""
-        self.logger.info(f"Démarrage de la simulation pour {num_days} jours...")
+        sim_logger = self.sim_logger
+        sim_logger.info("Démarrage de la simulation pour %d jours...", num_days)
+        # Nombre de parcours par heure, calculé une seule fois à partir des patterns de trafic
+        base_journeys_per_hour = 5 # Adjust this base number as needed
+        journeys_per_hour = [max(1, int(base_journeys_per_hour * m)) for m in self.traffic_patterns] # Ensure at least 1 journey per hour
+        simulation_start = self._virtual_now
         for day in range(1, num_days + 1):
             for hour in range(24):
-                # Calculate number of journeys for this hour based on traffic pattern
-                base_journeys_per_hour = 5 # Adjust this base number as needed
-                journeys_this_hour = int(base_journeys_per_hour * self.traffic_patterns[hour])
-                journeys_this_hour = max(1, journeys_this_hour) # Ensure at least 1 journey per hour
+                if not self.realtime:
+                    # Aligne l'horloge virtuelle sur l'heure simulée pour que les timestamps suivent le pattern de trafic
+                    self._virtual_now = max(self._virtual_now, simulation_start + timedelta(days=day - 1, hours=hour))
+                journeys_this_hour = journeys_per_hour[hour]
+                traffic_mult = self.traffic_patterns[hour]
 
-                self.logger.info(f"Simulating Day {day}, Hour {hour}:00 - {journeys_this_hour} user journeys expected.")
+                sim_logger.info("Simulating Day %d, Hour %d:00 - %d user journeys expected.", day, hour, journeys_this_hour)
                 for i in range(journeys_this_hour):
-                    self.logger.info(f"  Simulating user journey {i+1}/{journeys_this_hour} for Day {day}, Hour {hour}:00")
+                    sim_logger.info("  Simulating user journey %d/%d for Day %d, Hour %d:00", i + 1, journeys_this_hour, day, hour)
                     try:
-                        self.simulate_user_journey(current_hour=hour)
+                        self.simulate_user_journey(traffic_mult)
                     except Exception as e:
-                        self.logger.error(f"An error occurred during user journey {i+1} at Day {day}, Hour {hour}: {e}", exc_info=True)
-                    time.sleep(random.uniform(0.1, 0.5)) # Shorter pause between journeys within an hour
-                time.sleep(random.uniform(0.5, 2.0)) # Longer pause between hours
+                        sim_logger.error("An error occurred during user journey %d at Day %d, Hour %d: %s", i + 1, day, hour, e, exc_info=True)
+                    self.pause(0.1, 0.5) # Shorter pause between journeys within an hour
+                self.pause(0.5, 2.0) # Longer pause between hours
 
-        self.logger.info("Simulation terminée.")
+        sim_logger.info("Simulation terminée.")
 
 if __name__ == "__main__":
-    app = EcommerceApp()
-    # Exécuter la simulation pour 2 jours
-    app.run_simulation(num_days=2)
+    arg_parser = argparse.ArgumentParser(description="Simulateur de logs e-commerce")
+    arg_parser.add_argument('--days', type=int, default=2, help="Nombre de jours à simuler")
+    arg_parser.add_argument('--realtime', action='store_true', help="Respecte les pauses en temps réel au lieu d'une horloge virtuelle")
+    arg_parser.add_argument('--framed-log', default=None, help="Fichier supplémentaire où écrire les événements en trames binaires (rotation à 256 Mo)")
+    arg_parser.add_argument('--seed', type=int, default=None, help="Graine du générateur aléatoire (parcours, identifiants et heures reproductibles ; la date reste celle du jour)")
+    args = arg_parser.parse_args()
+
+    app = EcommerceApp(realtime=args.realtime, seed=args.seed, framed_log_path=args.framed_log)
+    # Exécuter la simulation pour 2 jours par défaut
+    app.run_simulation(num_days=args.days)
@@ -1,19 +1,86 @@
-from elasticsearch import Elasticsearch
-import json
-from datetime import datetime
-
-es = Elasticsearch("http://localhost:9200")  # Modifie si besoin
-
-def index_log(log: dict):
-    date_suffix = datetime.now().strftime("%Y.%m.%d")
-    index_name = f"logs-{date_suffix}"
-    es.index(index=index_name, document=log)
-
-if __name__ == "__main__":
-    with open("app.log", "r") as f:
-        for line in f:
-            try:
-                log = json.loads(line)
-                index_log(log)
-            except Exception as e:
-                print(f"❌ Erreur lors de l'insertion : {e}")
+import asyncio
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+import json
+from datetime import datetime
+
+from log_parser import iter_lines, loads
+
+# uvloop (boucle d'événements plus rapide) est utilisé s'il est installé
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Nombre de documents par requête bulk et nombre de requêtes bulk envoyées en parallèle
+BATCH_SIZE = 2000
+MAX_IN_FLIGHT = 16
+
+def create_client() -> AsyncElasticsearch:
+    """Client unique : connexions persistantes (une par requête en vol), requêtes compressées en gzip."""
+    return AsyncElasticsearch(
+        "http://localhost:9200",  # Modifie si besoin
+        http_compress=True,
+        request_timeout=60,
+        max_retries=3,
+        retry_on_timeout=True,
+        connections_per_node=MAX_IN_FLIGHT,
+        sniff_on_start=False,
+    )
+
+def read_batches(path: str, index_name: str, batch_size: int = BATCH_SIZE):
+    """Lit le fichier de logs (via mmap) et produit des lots d'actions bulk `{_index, _source}`."""
+    batch = []
+    for line in iter_lines(path):
+        try:
+            batch.append({"_index": index_name, "_source": loads(line)})
+        except json.JSONDecodeError as e:
+            print(f"❌ Ligne ignorée (JSON invalide) : {e}")
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def send_batch(es: AsyncElasticsearch, batch: list) -> int:
+    """
+    Envoie un lot via l'API bulk et affiche les documents rejetés. Une erreur de transport
+    (Elasticsearch indisponible, délai dépassé après les retries) est affichée sans
+    interrompre l'envoi des autres lots. Retourne le nombre de documents indexés.
+    """
+    try:
+        indexed, errors = await async_bulk(es, batch, chunk_size=len(batch), raise_on_error=False)
+    except Exception as e:
+        print(f"❌ Erreur lors de l'insertion : lot de {len(batch)} documents non envoyé ({e})")
+        return 0
+    for error in errors:
+        print(f"❌ Erreur lors de l'insertion : {error}")
+    return indexed
+
+async def main(path: str = "app.log"):
+    # L'index quotidien est calculé une seule fois pour tout le fichier
+    date_suffix = datetime.now().strftime("%Y.%m.%d")
+    index_name = f"logs-{date_suffix}"
+
+    es = create_client()
+    # Le sémaphore limite le nombre de requêtes bulk en vol (et donc de lots en mémoire)
+    in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+    tasks = []
+    try:
+        for batch in read_batches(path, index_name):
+            await in_flight.acquire()
+            task = asyncio.create_task(send_batch(es, batch))
+            task.add_done_callback(lambda _: in_flight.release())
+            tasks.append(task)
+        indexed = sum(await asyncio.gather(*tasks))
+        print(f"✅ {indexed} documents indexés dans {index_name}")
+    finally:
+        # Le client n'est fermé qu'une fois tous les lots en vol terminés
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await es.close()
+
+if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
+    asyncio.run(main())
@@ -1,11 +1,82 @@
 # log_parser.py
 import json
-from typing import Dict, List, Any
+import mmap
+import os
+import re
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterator, Callable
 import logging
 from datetime import datetime
 
+# orjson (extension C) accélère le décodage s'il est installé ; son JSONDecodeError
+# hérite de json.JSONDecodeError, la gestion d'erreurs reste donc identique
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads  # type: ignore[assignment]
+
+# Champs obligatoires d'une entrée de log et leur type attendu
+_REQUIRED_FIELDS = (
+    ('timestamp', str),
+    ('event_type', str),
+    ('session_id', str),
+    ('user_id', str),
+    ('ip_address', str),
+    ('user_agent', str),
+    ('location', str),
+    ('data', dict),
+)
+
+# Forme d'un timestamp ISO 8601 (tel que produit par datetime.isoformat), vérifiée sans créer d'objet datetime ;
+# re.ASCII : \d ne reconnaît que les chiffres 0-9 (pas les chiffres Unicode pleine largeur, etc.)
+_TIMESTAMP_RE = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:\d{2})?', re.ASCII)
+
+def iter_lines(path: str) -> Iterator[bytes]:
+    """
+    Itère sur les lignes (bytes, sans le '\\n') d'un fichier projeté en mémoire (mmap),
+    sans passer par le tampon d'un objet fichier Python.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        find = mm.find
+        position = 0
+        end = len(mm)
+        while position < end:
+            newline = find(b'\n', position)
+            if newline == -1:
+                newline = end
+            yield mm[position:newline]
+            position = newline + 1
+
+# En-tête des trames binaires : longueur du JSON en uint32 little-endian
+_FRAME_HEADER = struct.Struct('<I')
+
+def _build_field_validator(fields: tuple) -> Any:
+    """
+    Génère (une seule fois, à l'import) une fonction de validation spécialisée pour `fields` :
+    une suite de tests en ligne droite, sans boucle ni dictionnaire intermédiaire.
+    La comparaison de type est stricte (`type(v) is t`) ; les sous-classes retombent
+    sur le chemin lent de validate_log_entry.
+    """
+    lines = ['def _has_required_fields(entry):', '    get = entry.get']
+    namespace = {}
+    for i, (field, expected_type) in enumerate(fields):
+        namespace[f'_type_{i}'] = expected_type
+        lines.append(f'    if type(get({field!r})) is not _type_{i}: return False')
+    lines.append('    return True')
+    exec('\n'.join(lines), namespace)
+    return namespace['_has_required_fields']
+
+# Vérification rapide de la présence et du type des champs obligatoires
+_has_required_fields = _build_field_validator(_REQUIRED_FIELDS)
+
 class LogParser:
-    def __init__(self):
+    def __init__(self, json_loads: Callable[[str | bytes], Any] = loads):
+        # Fonction de décodage JSON (orjson par défaut s'il est installé), injectable par l'appelant
+        self._loads = json_loads
         # Liste pour stocker les lignes de log qui n'ont pas pu être parsées ou validées
         self.failed_logs: List[Dict[str, Any]] = []
         # Statistiques sur le parsing
@@ -21,66 +92,120 @@ class LogParser:
         )
         self.logger = logging.getLogger(__name__)
 
-    def parse_log_line(self, line: str) -> Dict | None:
+    def parse_log_line(self, line: str | bytes) -> Dict | None:
         """
-        Parse une ligne de log JSON.
+        Parse une ligne de log JSON (str ou bytes).
         Gère les logs malformés et tente une re-tentative simple.
         Retourne le dictionnaire parsé si succès, sinon None.
         """
         parsed_entry = None
         try:
-            parsed_entry = json.loads(line)
+            parsed_entry = self._loads(line)
             # Si le parsing réussit, valider l'entrée
             if self.validate_log_entry(parsed_entry):
                 self.stats['parsed'] += 1
                 return parsed_entry
             else:
                 # Log non valide après parsing
+                line = self._as_text(line)
                 error_message = f"Validation failed for log entry: {line}"
                 self.logger.warning(error_message)
                 self._handle_failed_log(line, "validation_failed", error_message)
                 return None
         except json.JSONDecodeError as e:
             # Gérer les logs malformés (non-JSON)
+            line = self._as_text(line)
             error_message = f"Malformed JSON log line: {e} - Line: {line.strip()}"
             self.logger.error(error_message)
             self._handle_failed_log(line, "json_decode_error", error_message)
             return None
         except Exception as e:
             # Gérer toute autre exception inattendue
+            line = self._as_text(line)
             error_message = f"Unexpected error parsing log line: {e} - Line: {line.strip()}"
             self.logger.error(error_message)
             self._handle_failed_log(line, "unexpected_error", error_message)
             return None
 
+    def parse_file(self, path: str) -> Iterator[Dict]:
+        """
+        Parse un fichier de logs complet, lu via mmap (voir iter_lines).
+        Les lignes sont passées en bytes au décodeur JSON ; seules les entrées valides sont renvoyées.
+        """
+        parse_log_line = self.parse_log_line
+        for line in iter_lines(path):
+            parsed_entry = parse_log_line(line)
+            if parsed_entry is not None:
+                yield parsed_entry
+
+    def parse_framed(self, path: str) -> Iterator[Dict]:
+        """
+        Parse un fichier de logs en trames binaires (`longueur uint32 little-endian + JSON`),
+        tel qu'écrit par FramedRotatingFileHandler. Le fichier est projeté en mémoire (mmap)
+        et parcouru sans recherche de fins de ligne. Une trame finale incomplète est ignorée.
+        """
+        if os.path.getsize(path) == 0:
+            return
+        parse_log_line = self.parse_log_line
+        unpack_from = _FRAME_HEADER.unpack_from
+        header_size = _FRAME_HEADER.size
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = 0
+            end = len(mm)
+            while position + header_size <= end:
+                (length,) = unpack_from(mm, position)
+                start = position + header_size
+                if start + length > end:
+                    break
+                parsed_entry = parse_log_line(mm[start:start + length])
+                if parsed_entry is not None:
+                    yield parsed_entry
+                position = start + length
+
+    def parse_file_parallel(self, path: str, workers: int | None = None) -> List[Dict]:
+        """
+        Parse un fichier de logs complet en répartissant les lignes sur plusieurs processus.
+        Le fichier est découpé en plages alignées sur les fins de ligne ; les statistiques
+        et logs échoués des workers sont fusionnés dans ce parser.
+        Retourne la liste des entrées valides, dans l'ordre du fichier.
+        """
+        workers = workers or os.cpu_count() or 1
+        size = os.path.getsize(path)
+        if size == 0:
+            return []
+        # Au moins un bloc par worker, sans dépasser _MAX_CHUNK_BYTES par bloc ;
+        # seules les bornes (et le décodeur JSON, picklé par référence) sont envoyées,
+        # chaque worker projette lui-même sa plage du fichier
+        chunk_size = min(_MAX_CHUNK_BYTES, max(1, size // workers))
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            chunks = [(path, start, end, self._loads) for start, end in _newline_aligned_bounds(mm, chunk_size)]
+
+        parsed_entries: List[Dict] = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for entries, stats, failed_logs in executor.map(_parse_chunk, chunks):
+                parsed_entries.extend(entries)
+                self.stats['parsed'] += stats['parsed']
+                self.stats['failed'] += stats['failed']
+                self.failed_logs.extend(failed_logs)
+        return parsed_entries
+
     def validate_log_entry(self, entry: Dict) -> bool:
         """
         Valide la structure et les types de données d'une entrée de log.
         Retourne True si l'entrée est valide, False sinon.
         """
-        required_fields = {
-            'timestamp': str,
-            'event_type': str,
-            'session_id': str,
-            'user_id': str,
-            'ip_address': str,
-            'user_agent': str,
-            'location': str,
-            'data': dict
-        }
-
-        for field, expected_type in required_fields.items():
-            if field not in entry:
-                self.logger.debug(f"Validation Error: Missing required field '{field}' in log entry: {entry}")
-                return False
-            if not isinstance(entry[field], expected_type):
-                self.logger.debug(f"Validation Error: Field '{field}' has incorrect type. Expected {expected_type}, got {type(entry[field])} in entry: {entry}")
-                return False
+        if not isinstance(entry, dict) or not _has_required_fields(entry):
+            # Chemin lent : explique l'échec dans les logs de debug (et accepte les sous-classes de type)
+            for field, expected_type in _REQUIRED_FIELDS:
+                if not isinstance(entry, dict) or field not in entry:
+                    self.logger.debug(f"Validation Error: Missing required field '{field}' in log entry: {entry}")
+                    return False
+                if not isinstance(entry[field], expected_type):
+                    self.logger.debug(f"Validation Error: Field '{field}' has incorrect type. Expected {expected_type}, got {type(entry[field])} in entry: {entry}")
+                    return False
 
         # Validation spécifique pour le format de timestamp (ISO format)
-        try:
-            datetime.fromisoformat(entry['timestamp'])
-        except ValueError:
+        if _TIMESTAMP_RE.fullmatch(entry['timestamp']) is None:
             self.logger.debug(f"Validation Error: Invalid timestamp format for '{entry['timestamp']}' in entry: {entry}")
             return False
 
@@ -94,6 +219,13 @@ class LogParser:
 
         return True
 
+    @staticmethod
+    def _as_text(line: str | bytes) -> str:
+        """Décode une ligne brute (bytes) pour les messages d'erreur."""
+        if isinstance(line, bytes):
+            return line.decode('utf-8', errors='replace')
+        return line
+
     def _handle_failed_log(self, original_line: str, reason: str, message: str):
         """
         Enregistre un log échoué pour une analyse ultérieure.
@@ -118,6 +250,31 @@ class LogParser:
         """Retourne la liste des logs qui n'ont pas pu être parsés ou validés."""
         return self.failed_logs
 
+# Taille maximale d'un bloc envoyé à un worker par parse_file_parallel
+_MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+def _newline_aligned_bounds(data, chunk_size: int) -> List[tuple[int, int]]:
+    """Découpe `data` en plages [début, fin) d'environ `chunk_size` octets, chacune se terminant sur une fin de ligne."""
+    bounds = []
+    start = 0
+    end_of_data = len(data)
+    while start < end_of_data:
+        newline = data.find(b'\n', min(start + chunk_size, end_of_data) - 1)
+        end = end_of_data if newline == -1 else newline + 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+def _parse_chunk(chunk: tuple[str, int, int, Callable[[str | bytes], Any]]) -> tuple[List[Dict], Dict[str, int], List[Dict[str, Any]]]:
+    """Parse une plage (chemin, début, fin, décodeur JSON) du fichier dans un processus worker (voir LogParser.parse_file_parallel)."""
+    path, start, end, json_loads = chunk
+    parser = LogParser(json_loads=json_loads)
+    parse_log_line = parser.parse_log_line
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lines = mm[start:end].splitlines()
+    entries = [entry for entry in map(parse_log_line, lines) if entry is not None]
+    return entries, parser.get_stats(), parser.get_failed_logs()
+
 # --- Exemple d'utilisation du LogParser ---
 if __name__ == "__main__":
     parser = LogParser()
@@ -1,36 +1,221 @@
 # log_pipeline.py
-import json
 import time
+import functools
+from collections import Counter
+from array import array
+from enum import IntEnum
 import re
+import sys
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
+import select
+import mmap
+import stat
+import threading
+import ctypes
+import ctypes.util
+from datetime import datetime
+from typing import Dict, List, Any, Tuple, Callable, NamedTuple, BinaryIO
 import logging
 
+# numpy (optionnel) compte les heures d'un lot en une passe (bincount sur un tableau d'octets)
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
 # Importer la classe LogParser depuis log_parser.py
 try:
-    from log_parser import LogParser
+    from log_parser import LogParser, loads
 except ImportError:
     print("Erreur: Impossible d'importer LogParser. Assurez-vous que log_parser.py est dans le même répertoire.")
     exit(1)
 
+# Taille par défaut d'un bloc d'octets lu en un appel système par le streaming
+READ_BLOCK_SIZE = 64 * 1024
+
+# Délai maximal d'attente d'un événement inotify avant de relire le fichier par sécurité
+INOTIFY_TIMEOUT_SECONDS = 5.0
+
+# Jetons recherchés dans les user agents, en une seule passe (les plus longs d'abord)
+_UA_TOKEN_RE = re.compile(
+    r'Windows NT 10\.0|Windows NT|Windows|Macintosh; Intel Mac OS X|Macintosh'
+    r'|iPad|iPhone|Android|Mobile|Ubuntu|Linux|X11'
+)
+# Un jeton long contient des jetons plus courts, que la regex ne renvoie pas séparément
+_UA_TOKEN_IMPLIES = {
+    'Windows NT 10.0': ('Windows NT 10.0', 'Windows NT', 'Windows'),
+    'Windows NT': ('Windows NT', 'Windows'),
+    'Macintosh; Intel Mac OS X': ('Macintosh; Intel Mac OS X', 'Macintosh'),
+}
+
+class Device(IntEnum):
+    """Type d'appareil déduit du user agent ; le nom affiché est DEVICE_NAMES[device]."""
+    UNKNOWN = 0
+    MOBILE = 1
+    TABLET = 2
+    DESKTOP = 3
+
+DEVICE_NAMES = ('Unknown', 'Mobile', 'Tablet', 'Desktop')
+
+class OS(IntEnum):
+    """Système d'exploitation déduit du user agent ; le nom affiché est OS_NAMES[os]."""
+    UNKNOWN = 0
+    WINDOWS_10 = 1
+    WINDOWS_OLDER = 2
+    MACOS = 3
+    ANDROID = 4
+    IOS = 5
+    LINUX = 6
+
+OS_NAMES = ('Unknown', 'Windows 10', 'Windows (Older)', 'macOS', 'Android', 'iOS', 'Linux')
+
+class EnrichedEntry(NamedTuple):
+    """Champs d'une entrée de log utilisés par les agrégations, enrichis du type d'appareil et de l'OS."""
+    event_type: str
+    timestamp: str
+    location: str
+    device_type: Device
+    os_name: OS
+    data: Dict[str, Any]
+
+class InotifyWatch:
+    """
+    Surveille les modifications d'un fichier via inotify (Linux, appelé par ctypes),
+    pour bloquer dans le noyau jusqu'à l'arrivée de nouvelles données au lieu de sonder.
+    Lève OSError si inotify n'est pas disponible.
+    """
+    IN_MODIFY = 0x00000002
+
+    def __init__(self, path: str):
+        # Vérifié avant ctypes.CDLL, qui lèverait une autre exception qu'OSError (TypeError sous Windows)
+        libc_path = ctypes.util.find_library('c') if sys.platform.startswith('linux') else None
+        if libc_path is None:
+            raise OSError(f"inotify n'est pas disponible sur cette plateforme ({sys.platform})")
+        libc = ctypes.CDLL(libc_path, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify n'est pas disponible sur cette plateforme")
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), self.IN_MODIFY) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch a échoué pour '{path}'")
+
+    def wait(self, timeout: float | None = None):
+        """Bloque jusqu'à une modification du fichier (ou l'expiration de `timeout`), puis vide les événements."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+class MmapTail:
+    """
+    Projection mmap en lecture d'un fichier de log en croissance : les lignes complètes sont
+    découpées directement dans la projection, sans appel read. Le fichier est re-projeté
+    quand sa taille change ; s'il a été tronqué (rotation copytruncate, `> app.log`),
+    la lecture reprend au début.
+    """
+
+    def __init__(self, fd: int, max_bytes: int = READ_BLOCK_SIZE):
+        self.fd = fd
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.mm: mmap.mmap | None = None
+
+    def read_lines(self, offset: int) -> Tuple[List[bytes], int]:
+        """
+        Renvoie les lignes complètes disponibles à partir de `offset` (environ `max_bytes` octets
+        au plus) et le nouvel offset. Une fin de ligne incomplète reste dans le fichier.
+        """
+        size = os.fstat(self.fd).st_size
+        if size != self.size:
+            # Jamais d'accès au-delà de la fin réelle du fichier (SIGBUS) : re-projection à la taille courante
+            if self.mm is not None:
+                self.mm.close()
+                self.mm = None
+            if size < self.size or offset > size:
+                # Fichier tronqué : les nouvelles lignes commencent au début
+                offset = 0
+            if size:
+                self.mm = mmap.mmap(self.fd, size, access=mmap.ACCESS_READ)
+            self.size = size
+        mm = self.mm
+        if mm is None or offset >= self.size:
+            return [], offset
+        last_newline = mm.rfind(b'\n', offset, min(self.size, offset + self.max_bytes))
+        if last_newline == -1:
+            # Ligne plus longue que max_bytes : aller jusqu'à sa fin
+            last_newline = mm.find(b'\n', offset, self.size)
+            if last_newline == -1:
+                return [], offset
+        return mm[offset:last_newline].split(b'\n'), last_newline + 1
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+
 class LogPipeline:
-    def __init__(self, log_file_path: str = 'app.log'):
+    def __init__(self, log_file_path: str = 'app.log', batch_size: int = 10000, read_block_size: int = READ_BLOCK_SIZE,
+                 display_interval: float = 10.0, json_loads: Callable[[str | bytes], Any] = loads):
         self.log_file_path = log_file_path
-        self.parser = LogParser() # Utilise le parser de logs existant
+        # Utilise le parser de logs existant ; le décodeur JSON (orjson s'il est installé) reçoit
+        # directement les lignes en bytes, son chemin le plus rapide
+        self.parser = LogParser(json_loads=json_loads)
         self.processed_logs_count = 0
-        self.start_time = None
-        self.end_time = None
-
-        # Agrégations en temps réel
-        self.realtime_aggregations = {
-            'event_type_counts': {},
-            'hourly_traffic': {hour: 0 for hour in range(24)},
-            'location_traffic': {},
-            'device_type_traffic': {},
-            'os_traffic': {},
+        # Nombre maximal d'octets lus en un appel système par le streaming
+        self.read_block_size = read_block_size
+        self.start_time: datetime | None = None
+        self.end_time: datetime | None = None
+
+        # Colonnes spécifiques par type d'événement, résolues en une seule recherche
+        self._event_handlers: Dict[str, Callable[[EnrichedEntry], None]] = {
+            'purchase': self._append_purchase,
+            'error': self._append_error,
+            'user_session_end': self._append_session
+        }
+
+        # Lot en cours, stocké par colonnes (une liste ou un tableau typé par champ agrégé)
+        # et agrégé tous les `batch_size` logs
+        self._col_event_type: List[str] = []
+        self._col_location: List[str] = []
+        self._col_device_type = array('B')
+        self._col_os_name = array('B')
+        self._col_hour = array('B')
+        self._col_amount = array('d')
+        self._col_error_code: List[str] = []
+        self._col_duration = array('d')
+        self._columns = (
+            self._col_event_type, self._col_location, self._col_device_type, self._col_os_name,
+            self._col_hour, self._col_amount, self._col_error_code, self._col_duration,
+        )
+        self._batch_size = batch_size
+
+        # Affichage périodique dans un thread d'arrière-plan, hors de la boucle d'ingestion ;
+        # le verrou protège les agrégations entre leur mise à jour et leur copie pour l'affichage
+        self.display_interval = display_interval
+        self._lock = threading.Lock()
+        self._stop_display = threading.Event()
+        self._display_thread = threading.Thread(target=self._display_loop, daemon=True)
+
+        # Trafic horaire : une case par heure de la journée (indice = heure)
+        self._hourly_traffic: List[int] = [0] * 24
+
+        # Agrégations en temps réel (trafic par appareil et par OS compté par valeur de Device / OS)
+        self.realtime_aggregations: Dict[str, Any] = {
+            'event_type_counts': Counter(),
+            'hourly_traffic': self._hourly_traffic,
+            'location_traffic': Counter(),
+            'device_type_traffic': Counter(),
+            'os_traffic': Counter(),
             'purchase_summary': {'total_amount': 0.0, 'count': 0},
-            'error_counts': {},
+            'error_counts': Counter(),
             'session_duration_sum': 0,
             'session_duration_count': 0
         }
@@ -46,147 +231,274 @@ class LogPipeline:
         )
         self.logger = logging.getLogger(__name__)
 
-    def _parse_user_agent(self, user_agent: str) -> Dict[str, str]:
+    @property
+    def hourly_traffic(self) -> List[int]:
+        """Trafic horaire (indice = heure), même liste que realtime_aggregations['hourly_traffic']."""
+        return self._hourly_traffic
+
+    @staticmethod
+    @functools.lru_cache(maxsize=10000)
+    def _parse_user_agent(user_agent: str) -> Tuple[Device, OS]:
         """
         Parse le user agent pour extraire le type d'appareil et le système d'exploitation.
+        Retourne le tuple (Device, OS) ; les résultats sont mis en cache par user agent,
+        les flux de logs contenant très peu de user agents distincts.
         """
-        device_type = 'Unknown'
-        os_name = 'Unknown'
+        device_type: Device = Device.UNKNOWN
+        os_name: OS = OS.UNKNOWN
+
+        # Un seul passage de regex sur le user agent ; les tests suivants portent sur l'ensemble des jetons trouvés
+        tokens: set[str] = set()
+        for token in _UA_TOKEN_RE.findall(user_agent):
+            tokens.update(_UA_TOKEN_IMPLIES.get(token, (token,)))
 
         # Détection du type d'appareil
-        if 'Mobile' in user_agent or 'Android' in user_agent or 'iPhone' in user_agent or 'iPad' in user_agent:
-            if 'iPad' in user_agent:
-                device_type = 'Tablet'
+        if 'Mobile' in tokens or 'Android' in tokens or 'iPhone' in tokens or 'iPad' in tokens:
+            if 'iPad' in tokens:
+                device_type = Device.TABLET
             else:
-                device_type = 'Mobile'
-        elif 'Windows' in user_agent or 'Macintosh' in user_agent or 'X11' in user_agent or 'Linux' in user_agent:
-            device_type = 'Desktop'
+                device_type = Device.MOBILE
+        elif 'Windows' in tokens or 'Macintosh' in tokens or 'X11' in tokens or 'Linux' in tokens:
+            device_type = Device.DESKTOP
 
         # Détection du système d'exploitation
-        if 'Windows NT 10.0' in user_agent:
-            os_name = 'Windows 10'
-        elif 'Windows NT' in user_agent:
-            os_name = 'Windows (Older)'
-        elif 'Macintosh; Intel Mac OS X' in user_agent:
-            os_name = 'macOS'
-        elif 'Android' in user_agent:
-            os_name = 'Android'
-        elif 'iPhone' in user_agent or 'iPad' in user_agent:
-            os_name = 'iOS'
-        elif 'Ubuntu' in user_agent or 'Linux' in user_agent:
-            os_name = 'Linux'
-
-        return {'device_type': device_type, 'os_name': os_name}
-
-    def _enrich_log_entry(self, entry: Dict) -> Dict:
+        if 'Windows NT 10.0' in tokens:
+            os_name = OS.WINDOWS_10
+        elif 'Windows NT' in tokens:
+            os_name = OS.WINDOWS_OLDER
+        elif 'Macintosh; Intel Mac OS X' in tokens:
+            os_name = OS.MACOS
+        elif 'Android' in tokens:
+            os_name = OS.ANDROID
+        elif 'iPhone' in tokens or 'iPad' in tokens:
+            os_name = OS.IOS
+        elif 'Ubuntu' in tokens or 'Linux' in tokens:
+            os_name = OS.LINUX
+
+        return device_type, os_name
+
+    def _enrich_log_entry(self, entry: Dict[str, Any]) -> EnrichedEntry:
         """
         Enrichit une entrée de log parsée avec des informations supplémentaires.
+        Retourne un EnrichedEntry ; le dictionnaire parsé n'est pas modifié.
         """
-        # Enrichissement avec le type d'appareil et le système d'exploitation
-        user_agent_info = self._parse_user_agent(entry.get('user_agent', ''))
-        entry['device_type'] = user_agent_info['device_type']
-        entry['os_name'] = user_agent_info['os_name']
+        # Enrichissement avec le type d'appareil et le système d'exploitation (valeurs Device / OS)
+        device_type, os_name = self._parse_user_agent(entry.get('user_agent', ''))
+
+        # Petits domaines de valeurs : les chaînes sont internées pour que hachage et comparaisons
+        # dans les compteurs se fassent sur un objet unique par valeur.
+        # event_type et timestamp sont des chaînes garanties par la validation du LogParser.
+        event_type: str = sys.intern(entry['event_type'])
+        timestamp: str = entry['timestamp']
 
         # La géolocalisation (location) est déjà présente dans les logs générés par app.py
         # On peut la récupérer directement si elle existe
-        entry['location'] = entry.get('location', 'Unknown')
+        location = entry.get('location')
+        location = sys.intern(location) if location is not None else 'Unknown'
 
-        return entry
+        return EnrichedEntry(event_type, timestamp, location, device_type, os_name, entry.get('data', {}))
 
-    def _update_aggregations(self, entry: Dict):
+    def _append_to_columns(self, entry: EnrichedEntry) -> None:
         """
-        Met à jour les agrégations en temps réel avec les données de l'entrée de log.
+        Ajoute les champs agrégés de l'entrée de log aux colonnes du lot en cours.
         """
-        event_type = entry.get('event_type')
-        timestamp_str = entry.get('timestamp')
-        location = entry.get('location')
-        device_type = entry.get('device_type')
-        os_name = entry.get('os_name')
+        event_type: str = entry.event_type
+        timestamp_str: str = entry.timestamp
+
+        # Heure lue directement aux positions 11-12 du timestamp ISO ("YYYY-MM-DDTHH..."),
+        # format garanti par la validation du LogParser
+        try:
+            event_hour: int = int(timestamp_str[11:13])
+        except ValueError:
+            event_hour = -1
+        if 0 <= event_hour < 24:
+            self._col_hour.append(event_hour)
+        else:
+            self.logger.warning("Could not parse timestamp for hourly traffic: %s", timestamp_str)
+
+        self._col_event_type.append(event_type)
+        self._col_location.append(entry.location)
+        self._col_device_type.append(entry.device_type)
+        self._col_os_name.append(entry.os_name)
+
+        # Colonnes spécifiques à certains types d'événements (achats, erreurs, fins de session)
+        handler = self._event_handlers.get(event_type)
+        if handler:
+            handler(entry)
+
+    def _append_purchase(self, entry: EnrichedEntry) -> None:
+        """Montant de l'achat."""
+        self._append_number(self._col_amount, entry, 'total_amount', 0.0)
 
-        # Compteur d'événements par type
-        self.realtime_aggregations['event_type_counts'][event_type] = \
-            self.realtime_aggregations['event_type_counts'].get(event_type, 0) + 1
+    def _append_error(self, entry: EnrichedEntry) -> None:
+        """Code de l'erreur."""
+        self._col_error_code.append(entry.data.get('error_code', 'UNKNOWN_ERROR'))
 
-        # Trafic horaire
+    def _append_session(self, entry: EnrichedEntry) -> None:
+        """Durée de la session."""
+        self._append_number(self._col_duration, entry, 'duration_seconds', 0)
+
+    def _append_number(self, column: array, entry: EnrichedEntry, field: str, default: float) -> None:
+        """
+        Ajoute la valeur numérique `field` de `data` à une colonne typée ; une valeur non numérique
+        (ou hors de la plage d'un double) est ignorée avec un avertissement au lieu d'arrêter l'ingestion.
+        """
+        value = entry.data.get(field, default)
         try:
-            event_hour = datetime.fromisoformat(timestamp_str).hour
-            self.realtime_aggregations['hourly_traffic'][event_hour] = \
-                self.realtime_aggregations['hourly_traffic'].get(event_hour, 0) + 1
-        except (ValueError, TypeError):
-            self.logger.warning(f"Could not parse timestamp for hourly traffic: {timestamp_str}")
-
-        # Trafic par localisation
-        self.realtime_aggregations['location_traffic'][location] = \
-            self.realtime_aggregations['location_traffic'].get(location, 0) + 1
-
-        # Trafic par type d'appareil
-        self.realtime_aggregations['device_type_traffic'][device_type] = \
-            self.realtime_aggregations['device_type_traffic'].get(device_type, 0) + 1
-
-        # Trafic par OS
-        self.realtime_aggregations['os_traffic'][os_name] = \
-            self.realtime_aggregations['os_traffic'].get(os_name, 0) + 1
-
-        # Agrégations spécifiques pour les achats
-        if event_type == 'purchase':
-            total_amount = entry['data'].get('total_amount', 0.0)
-            self.realtime_aggregations['purchase_summary']['total_amount'] += total_amount
-            self.realtime_aggregations['purchase_summary']['count'] += 1
-
-        # Agrégations pour les erreurs
-        if event_type == 'error':
-            error_code = entry['data'].get('error_code', 'UNKNOWN_ERROR')
-            self.realtime_aggregations['error_counts'][error_code] = \
-                self.realtime_aggregations['error_counts'].get(error_code, 0) + 1
-
-        # Agrégations pour la durée de session
-        if event_type == 'user_session_end':
-            duration = entry['data'].get('duration_seconds', 0)
-            self.realtime_aggregations['session_duration_sum'] += duration
-            self.realtime_aggregations['session_duration_count'] += 1
-
-
-    def process_logs_streaming(self, interval_seconds: float = 1.0):
+            column.append(value)
+        except (TypeError, OverflowError):
+            self.logger.warning("Ignoring non-numeric %s in %s event: %r", field, entry.event_type, value)
+
+    def _flush_batch(self):
+        """
+        Agrège les colonnes du lot en cours en une fois (un Counter par colonne, numpy.bincount
+        pour les heures si numpy est disponible), fusionne le résultat dans les agrégations,
+        puis vide les colonnes.
+        """
+        if not self._col_event_type:
+            return
+        aggregations = self.realtime_aggregations
+        with self._lock:
+            aggregations['event_type_counts'].update(self._col_event_type)
+            aggregations['location_traffic'].update(self._col_location)
+            aggregations['device_type_traffic'].update(self._col_device_type)
+            aggregations['os_traffic'].update(self._col_os_name)
+
+            hourly_traffic = self._hourly_traffic
+            if np is not None and self._col_hour:
+                hour_counts = np.bincount(np.frombuffer(self._col_hour, dtype=np.uint8), minlength=24).tolist()
+                hourly_traffic[:] = [total + count for total, count in zip(hourly_traffic, hour_counts)]
+            else:
+                for event_hour in self._col_hour:
+                    hourly_traffic[event_hour] += 1
+
+            aggregations['purchase_summary']['total_amount'] += sum(self._col_amount)
+            aggregations['purchase_summary']['count'] += len(self._col_amount)
+            aggregations['error_counts'].update(self._col_error_code)
+            aggregations['session_duration_sum'] += sum(self._col_duration)
+            aggregations['session_duration_count'] += len(self._col_duration)
+
+        for column in self._columns:
+            del column[:]
+
+    def process_logs_streaming(self, interval_seconds: float = 1.0, use_inotify: bool = True, use_mmap: bool = True):
         """
-        Lit le fichier de log en streaming (simulé par une lecture ligne par ligne
-        avec un délai) et traite chaque entrée.
+        Lit le fichier de log en streaming (lecture par lots d'octets à partir d'un curseur)
+        et traite chaque entrée. Avec `use_mmap`, les lignes sont lues dans une projection mmap
+        du fichier (repli sur les lectures par blocs sous Windows ou si ce n'est pas un fichier
+        régulier). Quand aucune donnée n'est disponible, attend une modification du fichier
+        via inotify si possible, sinon patiente `interval_seconds` avant de réessayer.
         """
-        self.logger.info(f"Démarrage du pipeline de traitement des logs en streaming depuis '{self.log_file_path}'...")
+        self.logger.info("Démarrage du pipeline de traitement des logs en streaming depuis '%s'...", self.log_file_path)
         self.start_time = datetime.now()
 
         # Vérifier si le fichier existe, sinon attendre qu'il soit créé par app.py
         while not os.path.exists(self.log_file_path):
-            self.logger.info(f"En attente de la création du fichier de log '{self.log_file_path}'...")
+            self.logger.info("En attente de la création du fichier de log '%s'...", self.log_file_path)
             time.sleep(5) # Attendre 5 secondes avant de vérifier à nouveau
 
-        # Ouvrir le fichier en mode lecture (tail -f like behavior)
-        with open(self.log_file_path, 'r') as f:
+        self._display_thread.start()
+
+        # Ouvrir le fichier en lecture brute (tail -f like behavior)
+        # (O_BINARY sous Windows : pas de traduction des fins de ligne sur le descripteur)
+        fd = os.open(self.log_file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        watch = None
+        if use_inotify:
+            try:
+                # La surveillance est créée avant la première lecture : aucune écriture ne peut être manquée
+                watch = InotifyWatch(self.log_file_path)
+            except OSError as e:
+                self.logger.info("inotify indisponible (%s), repli sur une attente de %ss", e, interval_seconds)
+        # Source des lectures par blocs : le descripteur (os.pread) si la plateforme le permet,
+        # sinon un fichier bufferisé lu par seek/read (Windows)
+        source: int | BinaryIO = fd if hasattr(os, 'pread') else open(self.log_file_path, 'rb')
+        tail = None
+        if use_mmap and os.name != 'nt' and stat.S_ISREG(os.fstat(fd).st_mode):
+            tail = MmapTail(fd, max_bytes=self.read_block_size)
+        try:
             # Aller à la fin du fichier pour ne lire que les nouvelles lignes
-            f.seek(0, os.SEEK_END)
+            offset = os.fstat(fd).st_size
+            # Fin de ligne incomplète conservée d'un lot de lecture au suivant
+            remainder = b''
             self.logger.info("Fichier de log ouvert. En attente de nouvelles lignes...")
+            # Même sous charge continue, le lot partiel est agrégé au moins à chaque intervalle d'affichage
+            next_flush = time.monotonic() + self.display_interval
+
+            # Attributs utilisés à chaque ligne, liés une fois à des noms locaux
+            parse = self.parser.parse_log_line
+            enrich = self._enrich_log_entry
+            append = self._append_to_columns
+            flush = self._flush_batch
+            pending = self._col_event_type
+            batch_size = self._batch_size
+            logger = self.logger
 
             while True:
-                line = f.readline()
-                if not line:
-                    # Pas de nouvelle ligne, attendre un peu avant de réessayer
-                    time.sleep(interval_seconds)
-                    continue
-
-                self.processed_logs_count += 1
-                parsed_log = self.parser.parse_log_line(line)
-
-                if parsed_log:
-                    enriched_log = self._enrich_log_entry(parsed_log)
-                    self._update_aggregations(enriched_log)
-                    # self.logger.debug(f"Processed: {enriched_log['event_type']} - Location: {enriched_log['location']} - Device: {enriched_log['device_type']}")
+                if tail is not None:
+                    # Lignes complètes découpées dans la projection mmap
+                    lines, offset = tail.read_lines(offset)
+                    idle = not lines
                 else:
-                    self.logger.warning(f"Skipping malformed or invalid log: {line.strip()}")
-
-                # Afficher les statistiques de performance toutes les 100 logs traités
-                if self.processed_logs_count % 100 == 0:
-                    self.display_performance_metrics()
-                    self.display_realtime_aggregations()
+                    # Un seul appel système par lot : découpage en lignes complètes côté Python
+                    chunk = self._read_batch(source, offset)
+                    idle = not chunk
+                    if chunk:
+                        offset += len(chunk)
+                        lines = (remainder + chunk if remainder else chunk).split(b'\n')
+                        remainder = lines.pop()
+                if idle:
+                    # Flux au repos : agréger le lot partiel avant d'attendre
+                    flush()
+                    # Pas de nouvelles données : attendre une modification du fichier (ou un peu, sans inotify)
+                    if watch:
+                        watch.wait(timeout=INOTIFY_TIMEOUT_SECONDS)
+                    else:
+                        time.sleep(interval_seconds)
+                    continue
 
+                # Compteur mis à jour une fois par lot de lecture
+                self.processed_logs_count += len(lines)
+                for line in lines:
+                    parsed_log = parse(line)
+
+                    if parsed_log:
+                        enriched_log = enrich(parsed_log)
+                        append(enriched_log)
+                        if len(pending) >= batch_size:
+                            flush()
+                        # self.logger.debug(f"Processed: {enriched_log.event_type} - Location: {enriched_log.location} - Device: {enriched_log.device_type}")
+                    elif logger.isEnabledFor(logging.WARNING):
+                        logger.warning("Skipping malformed or invalid log: %s", line.decode('utf-8', errors='replace').rstrip())
+
+                if time.monotonic() >= next_flush:
+                    flush()
+                    next_flush = time.monotonic() + self.display_interval
+        finally:
+            self._stop_display.set()
+            if watch:
+                watch.close()
+            if tail is not None:
+                tail.close()
+            if not isinstance(source, int):
+                source.close()
+            os.close(fd)
+
+    def _display_loop(self):
+        """Affiche périodiquement les métriques et agrégations (thread d'arrière-plan)."""
+        while not self._stop_display.wait(self.display_interval):
+            self.display_performance_metrics()
+            self.display_realtime_aggregations()
+
+    def _read_batch(self, source: int | BinaryIO, offset: int) -> bytes:
+        """
+        Lit les octets disponibles à partir de `offset`, au plus `read_block_size` : en un seul
+        appel système (et une seule copie) avec os.pread sur un descripteur, sinon par seek/read
+        sur un fichier ouvert en binaire (plateformes sans os.pread, comme Windows).
+        """
+        if isinstance(source, int):
+            return os.pread(source, self.read_block_size, offset)
+        source.seek(offset)
+        return source.read(self.read_block_size)
 
     def display_performance_metrics(self):
         """Affiche les métriques de performance du pipeline."""
@@ -195,48 +507,58 @@ class LogPipeline:
             logs_per_second = self.processed_logs_count / elapsed_time if elapsed_time > 0 else 0
 
             self.logger.info("\n--- Métriques de Performance ---")
-            self.logger.info(f"Logs traités au total: {self.processed_logs_count}")
-            self.logger.info(f"Logs parsés avec succès: {self.parser.get_stats()['parsed']}")
-            self.logger.info(f"Logs échoués au parsing/validation: {self.parser.get_stats()['failed']}")
-            self.logger.info(f"Temps écoulé: {elapsed_time:.2f} secondes")
-            self.logger.info(f"Logs par seconde: {logs_per_second:.2f}")
+            self.logger.info("Logs traités au total: %d", self.processed_logs_count)
+            parser_stats = self.parser.get_stats()
+            self.logger.info("Logs parsés avec succès: %d", parser_stats['parsed'])
+            self.logger.info("Logs échoués au parsing/validation: %d", parser_stats['failed'])
+            self.logger.info("Temps écoulé: %.2f secondes", elapsed_time)
+            self.logger.info("Logs par seconde: %.2f", logs_per_second)
             self.logger.info("--------------------------------\n")
 
+    def snapshot_aggregations(self) -> Dict[str, Any]:
+        """Copie des agrégations en temps réel, prise sous le verrou (le thread d'ingestion n'est bloqué que le temps de la copie)."""
+        aggregations = self.realtime_aggregations
+        with self._lock:
+            return {
+                key: value.copy() if isinstance(value, (Counter, list, dict)) else value
+                for key, value in aggregations.items()
+            }
+
     def display_realtime_aggregations(self):
-        """Affiche les agrégations en temps réel."""
+        """Affiche les agrégations en temps réel (à partir d'une copie, hors du verrou)."""
+        aggregations = self.snapshot_aggregations()
         self.logger.info("\n--- Agrégations en Temps Réel ---")
         self.logger.info("Compteurs d'événements par type:")
-        for event_type, count in self.realtime_aggregations['event_type_counts'].items():
-            self.logger.info(f"  - {event_type}: {count}")
+        for event_type, count in aggregations['event_type_counts'].items():
+            self.logger.info("  - %s: %d", event_type, count)
 
         self.logger.info("\nTrafic horaire (par heure de la journée):")
-        sorted_hourly_traffic = sorted(self.realtime_aggregations['hourly_traffic'].items())
-        for hour, count in sorted_hourly_traffic:
-            self.logger.info(f"  - Heure {hour:02d}: {count} logs")
+        for hour, count in enumerate(aggregations['hourly_traffic']):
+            self.logger.info("  - Heure %02d: %d logs", hour, count)
 
         self.logger.info("\nTrafic par localisation:")
-        for location, count in self.realtime_aggregations['location_traffic'].items():
-            self.logger.info(f"  - {location}: {count}")
+        for location, count in aggregations['location_traffic'].items():
+            self.logger.info("  - %s: %d", location, count)
 
         self.logger.info("\nTrafic par type d'appareil:")
-        for device_type, count in self.realtime_aggregations['device_type_traffic'].items():
-            self.logger.info(f"  - {device_type}: {count}")
+        for device_type, count in aggregations['device_type_traffic'].items():
+            self.logger.info("  - %s: %d", DEVICE_NAMES[device_type], count)
 
         self.logger.info("\nTrafic par OS:")
-        for os_name, count in self.realtime_aggregations['os_traffic'].items():
-            self.logger.info(f"  - {os_name}: {count}")
+        for os_name, count in aggregations['os_traffic'].items():
+            self.logger.info("  - %s: %d", OS_NAMES[os_name], count)
 
         self.logger.info("\nRésumé des achats:")
-        self.logger.info(f"  - Nombre total d'achats: {self.realtime_aggregations['purchase_summary']['count']}")
-        self.logger.info(f"  - Montant total des achats: {self.realtime_aggregations['purchase_summary']['total_amount']:.2f}")
+        self.logger.info("  - Nombre total d'achats: %d", aggregations['purchase_summary']['count'])
+        self.logger.info("  - Montant total des achats: %.2f", aggregations['purchase_summary']['total_amount'])
 
         self.logger.info("\nCompteurs d'erreurs par code:")
-        for error_code, count in self.realtime_aggregations['error_counts'].items():
-            self.logger.info(f"  - {error_code}: {count}")
+        for error_code, count in aggregations['error_counts'].items():
+            self.logger.info("  - %s: %d", error_code, count)
 
-        if self.realtime_aggregations['session_duration_count'] > 0:
-            avg_duration = self.realtime_aggregations['session_duration_sum'] / self.realtime_aggregations['session_duration_count']
-            self.logger.info(f"\nDurée moyenne des sessions: {avg_duration:.2f} secondes")
+        if aggregations['session_duration_count'] > 0:
+            avg_duration = aggregations['session_duration_sum'] / aggregations['session_duration_count']
+            self.logger.info("\nDurée moyenne des sessions: %.2f secondes", avg_duration)
         else:
             self.logger.info("\nDurée moyenne des sessions: N/A (pas de sessions terminées)")
 
@@ -257,12 +579,13 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         pipeline.end_time = datetime.now()
         pipeline.logger.info("Pipeline arrêté par l'utilisateur.")
+        pipeline._flush_batch()
         pipeline.display_performance_metrics()
         pipeline.display_realtime_aggregations()
         parser_stats = pipeline.parser.get_stats()
-        pipeline.logger.info(f"Statistiques finales du parser: Parsed={parser_stats['parsed']}, Failed={parser_stats['failed']}")
+        pipeline.logger.info("Statistiques finales du parser: Parsed=%d, Failed=%d", parser_stats['parsed'], parser_stats['failed'])
         if pipeline.parser.get_failed_logs():
             pipeline.logger.info("Logs échoués:")
             for failed_log in pipeline.parser.get_failed_logs():
-                pipeline.logger.info(f"  - Reason: {failed_log['reason']}, Line: {failed_log['original_line'][:100]}...")
+                pipeline.logger.info("  - Reason: %s, Line: %.100s...", failed_log['reason'], failed_log['original_line'])
 